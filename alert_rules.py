@@ -0,0 +1,191 @@
+from massa_records import AddressSnapshot
+
+from collections.abc import Mapping
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, rules are evaluated in pure Python without it
+    np = None
+
+kinds = ("misses", "miss_ratio", "roll_drop", "balance_divergence")
+kind_ids = {kind: i for i, kind in enumerate(kinds)}
+kind_help = {
+    "misses": "at least <threshold> missed blocks over the last <cycles> cycles",
+    "miss_ratio": "at least <threshold>% of blocks missed over the last <cycles> cycles",
+    "roll_drop": "candidate rolls at least <threshold> below final rolls",
+    "balance_divergence": "candidate balance differs from final balance by at least <threshold> MAS",
+}
+max_cycles = 10
+positive_thresholds = {"misses", "roll_drop", "balance_divergence"}  # A threshold of 0 always triggers
+windowed_kinds = {"misses", "miss_ratio"}  # The other kinds look at the current balances only, not at cycles
+
+type Rules = dict[str, tuple[float, int]]
+type Triggered = tuple[str, float, int]  # kind, threshold, cycles
+default_rules: Rules = {"misses": (1, 2)}
+
+def parse_rules(text: str) -> Rules:
+    """Parse rules stored as `kind:threshold:cycles;...`, an empty string meaning no rule."""
+    rules: Rules = {}
+    for item in text.split(";"):
+        if not item:
+            continue
+        kind, threshold, cycles = item.split(":")
+        if kind in kind_ids:
+            rules[kind] = (float(threshold), min(max(int(cycles), 1), max_cycles) if kind in windowed_kinds else 1)
+    return rules
+
+def format_rules(rules: Rules) -> str:
+    return ";".join(f"{kind}:{threshold:g}:{cycles}" for kind, (threshold, cycles) in rules.items())
+
+def describe(kind: str, threshold: float, cycles: int) -> str:
+    match kind:
+        case "misses":
+            return f"{threshold:g}+ missed blocks over {cycles} cycles"
+        case "miss_ratio":
+            return f"{threshold:g}%+ missed blocks over {cycles} cycles"
+        case "roll_drop":
+            return f"candidate rolls {threshold:g}+ below final"
+        case "balance_divergence":
+            return f"candidate balance {threshold:g}+ MAS away from final"
+    raise ValueError(f"Unknown rule kind: {kind!r}")
+
+class Columns:
+    """Column arrays of a `get_addresses` batch, with block counts summed from the most recent cycle back."""
+    def __init__(self, infos: list[AddressSnapshot], cycles: int):
+        self.rows = {info.address: row for row, info in enumerate(infos)}
+        self.cycles = cycles
+        ok, nok = [], []
+        for info in infos:
+            recent = info.cycle_infos[::-1][:cycles]
+            ok_sum = nok_sum = 0
+            ok_row, nok_row = [], []
+            for i in range(cycles):
+                if i < len(recent):
+                    ok_sum += recent[i].ok_count
+                    nok_sum += recent[i].nok_count
+                ok_row.append(ok_sum)
+                nok_row.append(nok_sum)
+            ok.append(ok_row)
+            nok.append(nok_row)
+        final_rolls = [info.final_roll_count or 0 for info in infos]
+        candidate_rolls = [info.candidate_roll_count or 0 for info in infos]
+        final_balance = [float(info.final_balance or 0) for info in infos]
+        candidate_balance = [float(info.candidate_balance or 0) for info in infos]
+        if np is not None:
+            self.ok: Any = np.array(ok, dtype=np.int64).reshape(len(infos), cycles)
+            self.nok: Any = np.array(nok, dtype=np.int64).reshape(len(infos), cycles)
+            self.roll_drop: Any = np.array(final_rolls, dtype=np.int64) - np.array(candidate_rolls, dtype=np.int64)
+            self.balance_divergence: Any = np.abs(np.array(candidate_balance) - np.array(final_balance))
+        else:
+            self.ok, self.nok = ok, nok
+            self.roll_drop = [f - c for f, c in zip(final_rolls, candidate_rolls)]
+            self.balance_divergence = [abs(c - f) for c, f in zip(candidate_balance, final_balance)]
+
+class RuleTable:
+    """All the rules of the watched subscriptions, flattened to one row per (address, user, rule).
+
+    Rows are grouped by address, so evaluating a `get_addresses` batch only touches the rows
+    of the addresses in that batch. Build it when the subscriptions change, not on every sweep.
+    """
+    def __init__(self, watching: Mapping[str, Any]):
+        self.address_index: dict[str, int] = {}
+        starts, ends, uids, kind_column, thresholds, cycles = [], [], [], [], [], []
+        for address, watched in watching.items():
+            start = len(uids)
+            for uid, user in watched.users.items():
+                for kind, (threshold, n) in user.rules.items():
+                    uids.append(uid)
+                    kind_column.append(kind_ids[kind])
+                    thresholds.append(threshold)
+                    cycles.append(min(max(n, 1), max_cycles))
+            if len(uids) > start:
+                self.address_index[address] = len(starts)
+                starts.append(start)
+                ends.append(len(uids))
+        self.address_list = list(self.address_index)
+        self.uids: list[int] = uids
+        self.cycles_needed = max(cycles, default=1)
+        self.starts: Any = starts
+        self.ends: Any = ends
+        if np is not None:
+            self.starts = np.array(starts, dtype=np.int64)
+            self.ends = np.array(ends, dtype=np.int64)
+            self.kinds: Any = np.array(kind_column, dtype=np.int64)
+            self.thresholds: Any = np.array(thresholds, dtype=np.float64)
+            self.cycles: Any = np.array(cycles, dtype=np.int64)
+        else:
+            self.kinds, self.thresholds, self.cycles = kind_column, thresholds, cycles
+
+    def __len__(self):
+        return len(self.uids)
+
+    def batch_addresses(self, infos: list[AddressSnapshot]) -> tuple[list[int], list[int]]:
+        """Return the batch rows of the snapshots that have rules, and their address indices in the table."""
+        rows, addresses = [], []
+        for row, info in enumerate(infos):
+            address_idx = self.address_index.get(info.address)
+            if address_idx is not None:
+                rows.append(row)
+                addresses.append(address_idx)
+        return rows, addresses
+
+    def evaluate(self, infos: list[AddressSnapshot]) -> list[tuple[str, int, Triggered]]:
+        """Return the address, uid and (kind, threshold, cycles) of the rules triggered by a batch of snapshots.
+
+        The rule settings are the ones captured when the table was built, the live ones may have changed since.
+        """
+        batch_rows, batch_addresses = self.batch_addresses(infos)
+        if not batch_rows:
+            return []
+        columns = Columns(infos, self.cycles_needed)
+        if np is None:
+            return self._evaluate_python(columns, batch_rows, batch_addresses)
+        address_idx = np.array(batch_addresses, dtype=np.int64)
+        starts = self.starts[address_idx]
+        lengths = self.ends[address_idx] - starts
+        # Indices of the rule rows of each batch address, concatenated
+        offsets = np.cumsum(lengths) - lengths
+        selected = np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+        rows = np.repeat(np.array(batch_rows, dtype=np.int64), lengths)
+        owners = np.repeat(address_idx, lengths)
+        rule_kinds = self.kinds[selected]
+        thresholds = self.thresholds[selected]
+        cycle_idx = self.cycles[selected] - 1
+        ok = columns.ok[rows, cycle_idx]
+        nok = columns.nok[rows, cycle_idx]
+        ratio = np.where(ok + nok > 0, nok * 100.0 / np.maximum(ok + nok, 1), 0.0)
+        triggered = np.select(
+            [rule_kinds == kind_ids["misses"], rule_kinds == kind_ids["miss_ratio"],
+             rule_kinds == kind_ids["roll_drop"], rule_kinds == kind_ids["balance_divergence"]],
+            [nok >= thresholds, (nok > 0) & (ratio >= thresholds),
+             columns.roll_drop[rows] >= thresholds, columns.balance_divergence[rows] >= thresholds],
+            default=False,
+        )
+        hits = np.flatnonzero(triggered)
+        return [(self.address_list[owner], self.uids[i], self.rule(i))
+                for i, owner in zip(selected[hits].tolist(), owners[hits].tolist())]
+
+    def rule(self, i: int) -> Triggered:
+        return kinds[self.kinds[i]], float(self.thresholds[i]), int(self.cycles[i])
+
+    def _evaluate_python(self, columns: Columns, batch_rows: list[int], batch_addresses: list[int]) -> list[tuple[str, int, Triggered]]:
+        result = []
+        for row, address_idx in zip(batch_rows, batch_addresses):
+            for i in range(self.starts[address_idx], self.ends[address_idx]):
+                kind = kinds[self.kinds[i]]
+                threshold = self.thresholds[i]
+                n = self.cycles[i] - 1
+                ok, nok = columns.ok[row][n], columns.nok[row][n]
+                match kind:
+                    case "misses":
+                        hit = nok >= threshold
+                    case "miss_ratio":
+                        hit = nok > 0 and nok * 100.0 / (ok + nok) >= threshold
+                    case "roll_drop":
+                        hit = columns.roll_drop[row] >= threshold
+                    case _:
+                        hit = columns.balance_divergence[row] >= threshold
+                if hit:
+                    result.append((self.address_list[address_idx], self.uids[i], self.rule(i)))
+        return result
@@ -0,0 +1,25 @@
+from env import log
+
+from collections.abc import Awaitable
+
+import time
+
+phase_timings: dict[str, float] = {}
+
+async def phase[T](name: str, aw: Awaitable[T]) -> T:
+    """Await a startup phase, recording how long it took."""
+    start = time.perf_counter()
+    log(f"Startup phase {name!r} started.")
+    try:
+        return await aw
+    finally:
+        phase_timings[name] = time.perf_counter() - start
+        log(f"Startup phase {name!r} finished in {phase_timings[name]:.2f}s.")
+
+def startup_report() -> str:
+    """Format the duration of each startup phase."""
+    if not phase_timings:
+        return "No startup phase recorded."
+    lines = ["Startup phases:"]
+    lines.extend(f"{name}: {elapsed:.2f}s" for name, elapsed in phase_timings.items())
+    return "\n".join(lines)
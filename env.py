@@ -1,6 +1,7 @@
 from telethon import TelegramClient
 from telethon import Button
 from telethon import events
+from telethon.events.common import EventBuilder
 
 from datetime import timedelta
 from datetime import datetime
@@ -22,19 +23,15 @@ time_offset = timedelta(minutes=5)
 
 dot = Path(__file__).parent
 data_dir = dot / "data"
-data_dir.mkdir(exist_ok=True, parents=True)
 session_dir = data_dir / "sessions"
-session_dir.mkdir(exist_ok=True, parents=True)
 log_file = data_dir / "log.txt"
-log_file.touch(exist_ok=True)
 
-TG_API_ID = int(os.environ["TG_API_ID"])
-TG_API_HASH = os.environ["TG_API_HASH"]
-TG_BOT_TOKEN = os.environ["TG_BOT_TOKEN"]
-TG_USERNAME = os.environ["TG_USERNAME"].lstrip("@")
-TG_ADMIN = os.environ["TG_ADMIN"].lstrip("@")
-
-bot = TelegramClient(session_dir/TG_USERNAME, TG_API_ID, TG_API_HASH).start(bot_token=TG_BOT_TOKEN)
+# Credentials are only required to log in, so the modules can be imported without them
+TG_API_ID = os.environ.get("TG_API_ID", "")
+TG_API_HASH = os.environ.get("TG_API_HASH", "")
+TG_BOT_TOKEN = os.environ.get("TG_BOT_TOKEN", "")
+TG_USERNAME = os.environ.get("TG_USERNAME", "").lstrip("@")
+TG_ADMIN = os.environ.get("TG_ADMIN", "").lstrip("@")
 
 def cache(func=None, *,  ignore_args=None):
     if func is None:
@@ -48,6 +45,14 @@ def cache(func=None, *,  ignore_args=None):
         return _cache[key]
     return wrapper
 
+@cache
+def init_dirs() -> bool:
+    """Create the data directories on first use."""
+    data_dir.mkdir(exist_ok=True, parents=True)
+    session_dir.mkdir(exist_ok=True, parents=True)
+    log_file.touch(exist_ok=True)
+    return True
+
 class Loglevel:
     debug = "DEBUG"
     info = "INFO"
@@ -61,10 +66,55 @@ def log(*a, level=loglevel.info, **kw):
     """Log messages to the log file."""
     prefix = datetime.now().strftime(f"{level}[%Y-%m-%d %H:%M:%S]")
     default_f = kw.pop("file", sys.stderr)  # Remove file from kwargs, we handle it ourselves
+    init_dirs()
     with open(log_file, "a", encoding="utf-8") as f:
         print(prefix, *a, **kw, file=f, flush=True)
     print(prefix, *a, **kw, file=default_f, flush=True)
 
+class Bot:
+    """Telegram client created and logged in by `login`.
+
+    Handlers can be registered with `on` before that, so that importing the modules
+    registering commands does not connect to Telegram. Other attributes are forwarded
+    to the underlying `TelegramClient` once logged in.
+    """
+    def __init__(self):
+        self.client: TelegramClient | None = None
+        self.handlers: list[tuple[Callable, EventBuilder, str]] = []
+
+    def on(self, event: EventBuilder, label: str = ""):
+        def decorator(f):
+            self.handlers.append((f, event, label))
+            if self.client is not None:
+                self.client.add_event_handler(f, event)
+            return f
+        return decorator
+
+    async def login(self) -> TelegramClient:
+        if self.client is None:
+            missing = [name for name in ("TG_API_ID", "TG_API_HASH", "TG_BOT_TOKEN", "TG_USERNAME", "TG_ADMIN") if not globals()[name]]
+            if missing:
+                raise ValueError(f"Missing environment variables: {', '.join(missing)}")
+            init_dirs()
+            self.client = TelegramClient(session_dir/TG_USERNAME, int(TG_API_ID), TG_API_HASH)
+            for f, event, label in self.handlers:
+                self.client.add_event_handler(f, event)
+                if label:
+                    log(label)
+        await self.client.start(bot_token=TG_BOT_TOKEN)  # type: ignore
+        return self.client
+
+    async def logout(self):
+        if self.client is not None:
+            await self.client.disconnect()  # type: ignore
+
+    def __getattr__(self, name):
+        if self.client is None:
+            raise RuntimeError(f"Telegram client is not logged in, cannot access {name!r}.")
+        return getattr(self.client, name)
+
+bot = Bot()
+
 def get_name(user, prefix=""):
     name_parts = []
     if getattr(user, "first_name", None):
@@ -77,6 +127,10 @@ def get_name(user, prefix=""):
         return ""
     return prefix + " ".join(name_parts)
 
+async def is_admin(event) -> bool:
+    sender = await event.get_sender()
+    return (getattr(sender, "username", None) or "").lower() == TG_ADMIN.lower()
+
 def wrap_spaces(**kw: str) -> str:
     result = []
     endings = []
@@ -147,8 +201,7 @@ def command(f = None, /, cmd=None, event_new=True, event_btn=False, **arg_specs)
         raise ValueError(f"Command {cmd!r} is already registered as {commands[cmd]!r}")
     if event_new:
         pattern = make_pattern(cmd, kind="new", **arg_specs)
-        log(f"Command.NewMessage {cmd!r} registered with pattern r'{pattern}'")
-        @bot.on(events.NewMessage(pattern=pattern))
+        @bot.on(events.NewMessage(pattern=pattern), label=f"Command.NewMessage {cmd!r} registered with pattern r'{pattern}'")
         async def new_handler(event):
             if not event.is_private:
                 return await event.reply("I can only respond to private messages.", buttons=[Button.url("Send me a message", f"https://t.me/{TG_USERNAME}?start=start")])
@@ -157,8 +210,7 @@ def command(f = None, /, cmd=None, event_new=True, event_btn=False, **arg_specs)
         register_cmd(cmd, sig, arg_specs, f, new_handler, event_new=True)
     if event_btn:
         pattern = make_pattern(cmd, kind="btn", **arg_specs)
-        log(f"Command.CallbackQuery {cmd!r} registered with pattern r'{pattern}'")
-        @bot.on(events.CallbackQuery(pattern=pattern))
+        @bot.on(events.CallbackQuery(pattern=pattern), label=f"Command.CallbackQuery {cmd!r} registered with pattern r'{pattern}'")
         async def btn_handler(event):
             event.reply = event.edit
             bound = await bind_args(event, btn_handler)
@@ -45,6 +45,7 @@ class KeepAlive(BGTask):
         self.check_alive = check_alive
         self.last_alive = datetime.now() - time_offset
         self.started = False
+        self.restart_requested = False
         self.background_tasks: tuple[Callable[[], Coroutine]] = background_tasks
         self.on_disconnect: Callable[[], Coroutine] | None = on_disconnect
 
@@ -52,7 +53,7 @@ class KeepAlive(BGTask):
     async def keep_alive(self):
         loop = asyncio.get_event_loop()
         task = loop.create_task(self._keep_alive())
-        yield
+        yield self
         print("Stopping keep_alive...")
         task.cancel()
 
@@ -85,8 +86,17 @@ class KeepAlive(BGTask):
             await asyncio.sleep(self.interval)
         self.last_alive = datetime.now()
 
+    def request_restart(self):
+        """Restart the background task at the next keep alive iteration."""
+        self.restart_requested = True
+
     async def wait_for_lost_signal(self):
         while self.started:
+            if self.restart_requested:
+                log("Controlled restart requested, restarting background task.")
+                self.restart_requested = False
+                self.started = False
+                break
             self.started = await self.check_alive()
             if not self.started:
                 print("Lost signal, restarting background tasks...")
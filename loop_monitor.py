@@ -0,0 +1,135 @@
+from env import loglevel
+from env import log
+from env import dot
+
+from contextlib import asynccontextmanager
+from traceback import extract_stack
+from traceback import format_list
+from pathlib import Path
+
+import threading
+import asyncio
+import time
+import sys
+
+stall_buckets = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+unattributed = "<unattributed>"
+
+class StallStats:
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.buckets: list[int] = [0] * (len(stall_buckets) + 1)
+
+    def add(self, lag: float):
+        self.count += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+        for i, bound in enumerate(stall_buckets):
+            if lag <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def __str__(self):
+        histogram = " ".join(f"≤{bound:g}s:{n}" for bound, n in zip(stall_buckets, self.buckets) if n)
+        if self.buckets[-1]:
+            histogram = f"{histogram} >{stall_buckets[-1]:g}s:{self.buckets[-1]}".strip()
+        return f"n={self.count} total={self.total:.2f}s max={self.max:.2f}s [{histogram}]"
+
+def callsite(frame) -> tuple[str, str]:
+    """Return the innermost frame of our own code in the stack of `frame`, along with the formatted stack."""
+    stack = extract_stack(frame)
+    key = None
+    for summary in reversed(stack):
+        path = Path(summary.filename)
+        if path.parent == dot:
+            key = f"{path.name}:{summary.lineno} ({summary.name})"
+            break
+    if key is None and stack:
+        key = f"{Path(stack[-1].filename).name}:{stack[-1].lineno} ({stack[-1].name})"
+    return key or unattributed, "".join(format_list(stack))
+
+class LoopMonitor:
+    """Measure event loop scheduling delay and attribute stalls to the blocking callsite.
+
+    An asyncio task ticks every `interval` seconds and records how late it was woken up.
+    A watchdog thread samples the loop thread's stack as soon as a tick is overdue by more
+    than `threshold` seconds, so the stall can be attributed to the code that was running.
+    """
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.stats: dict[str, StallStats] = {}
+        self.max_lag: float = 0.0
+        self.ticks: int = 0
+        self.heartbeat: float = time.monotonic()
+        self.loop_thread_id: int | None = None
+        self.captured: tuple[str, str] | None = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    @asynccontextmanager
+    async def monitor(self):
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.stopped.clear()
+        task = asyncio.create_task(self._tick())
+        watchdog = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        log(f"Loop monitor started (interval={self.interval}s, threshold={self.threshold}s).")
+        try:
+            yield self
+        finally:
+            task.cancel()
+            self.stopped.set()
+            log(f"Loop monitor stopped.\n{self.report()}")
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.heartbeat = now
+            self.ticks += 1
+            lag = now - expected
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.record(lag)
+
+    def _watchdog(self):
+        while not self.stopped.wait(self.interval):
+            if time.monotonic() - self.heartbeat < self.interval + self.threshold:
+                continue
+            with self.lock:
+                if self.captured is not None:
+                    continue  # Already captured this stall
+                frame = sys._current_frames().get(self.loop_thread_id)  # type: ignore
+                if frame is None:
+                    continue
+                self.captured = callsite(frame)
+                del frame
+
+    def record(self, lag: float):
+        with self.lock:
+            captured, self.captured = self.captured, None
+        key, stack = captured or (unattributed, "")
+        if key not in self.stats:
+            self.stats[key] = StallStats()
+        self.stats[key].add(lag)
+        log(f"Event loop stalled for {lag:.3f}s at {key}\n{stack}".rstrip(), level=loglevel.warn)
+
+    def report(self, limit: int = 20) -> str:
+        """Format per-callsite stall statistics, worst offenders first."""
+        total = sum(s.count for s in self.stats.values())
+        lines = [f"Loop stalls: {total} over {self.ticks} ticks, max lag {self.max_lag:.3f}s (threshold {self.threshold}s)"]
+        ranked = sorted(self.stats.items(), key=lambda x: x[1].total, reverse=True)
+        for key, stats in ranked[:limit]:
+            lines.append(f"{key}: {stats}")
+        if len(ranked) > limit:
+            lines.append(f"... and {len(ranked) - limit} more callsites")
+        return "\n".join(lines)
+
+loop_monitor = LoopMonitor()
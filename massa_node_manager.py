@@ -1,3 +1,6 @@
+from rpc_scheduler import rpc_scheduler
+from rpc_scheduler import priority
+from massa_records import loads
 from keep_alive import BGProcess
 from env import data_dir
 from env import log
@@ -6,6 +9,7 @@ from env import dot
 from collections.abc import Coroutine
 from collections.abc import Callable
 from traceback import format_exc
+from typing import Any
 from pathlib import Path
 import contextlib
 import platform
@@ -15,16 +19,21 @@ import asyncio
 import aiohttp
 import shutil
 
-def kill_node():
+async def kill_node():
     """Kill the Massa node process if it is running using pkill."""
-    import subprocess
-    try:
-        subprocess.run(["pkill", "-f", "massa-node"], check=True)
+    process = await asyncio.create_subprocess_exec("pkill", "-f", "massa-node")
+    if await process.wait() == 0:
         log("Massa node process killed successfully.")
-    except subprocess.CalledProcessError:
+    else:
         log("No Massa node process found to kill.")
 
-kill_node()  # Ensure any previous node is killed before starting a new one
+def sha256_file(file: Path) -> str:
+    """Hash a file in chunks, to be run in a thread."""
+    digest = hashlib.sha256()
+    with file.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 platforms = {
     "aarch64": "linux_arm64",
@@ -78,7 +87,7 @@ async def download_massa_node() -> tuple[Path, bool]:
     log(f"Checksum for {file_name}: {expected_file_hash}")
     file = data_dir / file_name
     if file.exists():
-        file_hash = hashlib.sha256(file.read_bytes()).hexdigest()
+        file_hash = await asyncio.to_thread(sha256_file, file)
         if file_hash == expected_file_hash:
             log(f"File {file_name} already exists and is verified with checksum {file_hash}.")
             return file, False
@@ -88,20 +97,21 @@ async def download_massa_node() -> tuple[Path, bool]:
             if response.status != 200:
                 raise ValueError(f"Failed to download file: {response.status}")
             content = await response.read()
-            file_hash = hashlib.sha256(content).hexdigest()
+            file_hash = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
             if file_hash != expected_file_hash:
                 raise ValueError(f"Checksum mismatch: expected {expected_file_hash}, got {file_hash}")
             log(f"Downloaded and verified {file_name} successfully.")
-            with file.open("wb") as f:
-                f.write(content)
-                return file, True
+            await asyncio.to_thread(file.write_bytes, content)
+            return file, True
 
 async def unpack(targz: Path, dest: Path):
     if not targz.exists():
         raise ValueError(f"File {targz} does not exist.")
-    with tarfile.open(targz, "r:gz") as tar:
-        tar.extractall(path=dest)
-        log(f"Unpacked {targz} to {dest}")
+    def extract():
+        with tarfile.open(targz, "r:gz") as tar:
+            tar.extractall(path=dest)
+    await asyncio.to_thread(extract)
+    log(f"Unpacked {targz} to {dest}")
 
 async def configure_massa_node():
     config_files = [
@@ -112,7 +122,7 @@ async def configure_massa_node():
         if not src.exists():
             raise ValueError(f"Source file {src} does not exist.")
         log(f"Copying {str(src)} to {str(dest)}")
-        shutil.copy(src, dest)
+        await asyncio.to_thread(shutil.copy, src, dest)
 
 async def install_massa_node():
     targz, install = await download_massa_node()
@@ -120,9 +130,9 @@ async def install_massa_node():
         await unpack(targz, data_dir)
     await configure_massa_node()
 
-async def massa_api(method: str, *params):
+async def massa_api(method: str, *params, decode: Callable[[Any], Any] | None = None, prio: int = priority.interactive):
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        async with rpc_scheduler.slot(prio), aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=rpc_scheduler.timeout(prio))) as session:
             url = "http://localhost:33035"
             headers = {"Content-Type": "application/json"}
             payload = {
@@ -131,11 +141,13 @@ async def massa_api(method: str, *params):
                 "method": method,
                 "params": [*params]
             }
-            async with session.post(url, json=payload, headers=headers, timeout=5) as response:
+            async with session.post(url, json=payload, headers=headers) as response:
                 if response.status != 200:
                     raise ValueError(f"Failed to get addresses info: {response.status}")
-                data = await response.json()
+                data = loads(await response.read())
                 result = data.get("result", None)
+                if decode is not None and result is not None:
+                    return decode(result)
                 return result
     except Exception as e:
         log(f"Error in massa_api call: {e}")
@@ -145,7 +157,7 @@ async def check_massa_alive() -> bool:
     """Check if the Massa node is alive by querying its API."""
     for _ in range(3):
         try:
-            result = await massa_api("get_status")
+            result = await massa_api("get_status", prio=priority.alerting)
             if not result:
                 log("Massa node is not running or returned no status.")
                 return False
@@ -162,7 +174,10 @@ async def check_massa_alive() -> bool:
 
 @contextlib.asynccontextmanager
 async def run_massa_node(*background_tasks: Callable[[], Coroutine], on_disconnect: Callable[[], Coroutine] | None = None):
-    await install_massa_node()
+    """Spawn the Massa node installed by `install_massa_node` and keep it alive.
+
+    Any previous node must be killed with `kill_node` before the install, not here.
+    """
     massa_node_path = data_dir / "massa" / "massa-node" / "massa-node"
     if not massa_node_path.exists():
         raise ValueError(f"Massa node executable not found at {massa_node_path}")
@@ -172,7 +187,7 @@ async def run_massa_node(*background_tasks: Callable[[], Coroutine], on_disconne
                          debug="Massa Node",
                          interval=60, background_tasks=background_tasks,
                          on_disconnect=on_disconnect,
-                         ).keep_alive():
+                         ).keep_alive() as process:
         log("Massa node is running. Press Ctrl+C to stop.")
         # Keep the main task running to allow background process to run
-        yield
+        yield process
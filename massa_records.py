@@ -0,0 +1,67 @@
+from typing import Any
+
+import json
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson is optional, the standard library parser is used without it
+    loads = json.loads
+
+class CycleInfo:
+    __slots__ = ("cycle", "is_final", "ok_count", "nok_count", "active_rolls")
+
+    def __init__(self, cycle: int, is_final: bool, ok_count: int, nok_count: int, active_rolls: int | None):
+        self.cycle = cycle
+        self.is_final = is_final
+        self.ok_count = ok_count
+        self.nok_count = nok_count
+        self.active_rolls = active_rolls
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "CycleInfo":
+        return cls(
+            data["cycle"],
+            data.get("is_final", False),
+            data.get("ok_count", 0),
+            data.get("nok_count", 0),
+            data.get("active_rolls"),
+        )
+
+    def __repr__(self):
+        return f"CycleInfo(cycle={self.cycle}, is_final={self.is_final}, ok_count={self.ok_count}, nok_count={self.nok_count}, active_rolls={self.active_rolls})"
+
+class AddressSnapshot:
+    """The fields of a `get_addresses` entry used by the watcher, cycles sorted oldest first."""
+    __slots__ = ("address", "final_balance", "candidate_balance", "final_roll_count", "candidate_roll_count", "cycle_infos", "next_block_draws")
+
+    def __init__(self, address: str, final_balance: str, candidate_balance: str,
+                 final_roll_count: int | None, candidate_roll_count: int | None, cycle_infos: tuple[CycleInfo, ...],
+                 next_block_draws: tuple[tuple[int, int], ...] = ()):
+        self.address = address
+        self.final_balance = final_balance
+        self.candidate_balance = candidate_balance
+        self.final_roll_count = final_roll_count
+        self.candidate_roll_count = candidate_roll_count
+        self.cycle_infos = cycle_infos
+        self.next_block_draws = next_block_draws  # (period, thread) slots
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "AddressSnapshot":
+        cycles = sorted((CycleInfo.from_json(c) for c in data.get("cycle_infos") or ()), key=lambda c: c.cycle)
+        return cls(
+            data["address"],
+            data.get("final_balance", "0"),
+            data.get("candidate_balance", "0"),
+            data.get("final_roll_count"),
+            data.get("candidate_roll_count"),
+            tuple(cycles),
+            tuple((d["period"], d["thread"]) for d in data.get("next_block_draws") or ()),
+        )
+
+    def __repr__(self):
+        return f"AddressSnapshot(address={self.address!r}, final_roll_count={self.final_roll_count}, candidate_roll_count={self.candidate_roll_count}, cycles={len(self.cycle_infos)})"
+
+def decode_addresses(result: list[dict[str, Any]]) -> list[AddressSnapshot]:
+    """Project a `get_addresses` result to snapshots, dropping the fields the watcher does not use."""
+    return [AddressSnapshot.from_json(entry) for entry in result]
@@ -1,37 +1,93 @@
 from telethon import Button
 
+from massa_node_manager import install_massa_node
 from massa_node_manager import run_massa_node
+from massa_node_manager import kill_node
 from massa_node_manager import massa_api
+from massa_records import AddressSnapshot
+from massa_records import decode_addresses
+from alert_rules import default_rules
+from alert_rules import format_rules
+from alert_rules import parse_rules
+from alert_rules import Triggered
+from alert_rules import RuleTable
+from alert_rules import positive_thresholds
+from alert_rules import windowed_kinds
+from alert_rules import max_cycles
+from alert_rules import kind_help
+from alert_rules import describe
+from alert_rules import Rules
+from alert_rules import kinds
+from staker_index import is_valid_address
+from staker_index import staker_index
+from loop_monitor import loop_monitor
+from node_monitor import node_monitor
+from keep_alive import atry
+from rpc_scheduler import rpc_scheduler
+from rpc_scheduler import priority
+from bootstrap import startup_report
+from bootstrap import phase
 from env import build_default_commands
 from env import TG_USERNAME
 from env import TG_ADMIN
 from env import noop_btn
 from env import loglevel
 from env import data_dir
+from env import is_admin
 from env import command
 from env import bot
 from env import log
 
+from contextlib import AsyncExitStack
 from traceback import format_exc
 from datetime import timedelta
 from datetime import datetime
 from itertools import batched
+from html import escape
 
+import itertools
 import asyncio
+import codecs
 import time
 import csv
+import io
+import re
 
 time_offset = timedelta(minutes=5)
 api_started = False
 
+message_limit = 4096
+summary_interval = timedelta(hours=6)
+summary_sent: dict[int, datetime] = {}
+
 class User:
-    def __init__(self, user_id, notify_ok = False, notify_nok = True):
+    def __init__(self, user_id, notify_ok = False, notify_nok = True, digest = False, rules: Rules | None = None):
         self.id: int = user_id
         self.notify_ok: bool = notify_ok
         self.notify_nok: bool = notify_nok
+        self.digest: bool = digest
+        self.rules: Rules = dict(default_rules) if rules is None else rules
 
     def __str__(self):
-        return f"User(id={self.id}, notify_ok={self.notify_ok}, notify_nok={self.notify_nok})"
+        return f"User(id={self.id}, notify_ok={self.notify_ok}, notify_nok={self.notify_nok}, digest={self.digest}, rules={format_rules(self.rules)!r})"
+
+async def send_to_user(uid: int, *messages: str) -> bool:
+    """Send HTML messages to a user, logging instead of raising when Telegram refuses them."""
+    try:
+        for message in messages:
+            await bot.send_message(uid, message, parse_mode="html")
+    except Exception as e:  # Blocked bot, deleted account, flood wait...
+        log(f"Could not send a message to user {uid}: {e}", level=loglevel.warn)
+        return False
+    return True
+
+class Digest:
+    """Alerts collected for one user during a sweep, sent as a single message."""
+    def __init__(self, uid: int):
+        self.uid = uid
+        self.nok: list[tuple[AddressSnapshot, list[Triggered]]] = []
+        self.ok: list[AddressSnapshot] = []
+        self.skipped = 0  # Watched addresses left out of the sweep, for summaries
 
 class Watched:
     def __init__(self, address: str, *users: User):
@@ -40,11 +96,21 @@ class Watched:
         self.timestamp: int = int(datetime.now().timestamp() - time_offset.total_seconds())
     def __contains__(self, uid: int) -> bool:
         return uid in self.users
-    async def notify_nok(self, info):
-        for uid, user in self.users.items():
+    async def notify_nok(self, info: AddressSnapshot, digests: dict[int, Digest], triggered: dict[int, list[Triggered]]):
+        """Notify the users whose rules were triggered, with the rules as they were evaluated."""
+        for uid, rules_triggered in triggered.items():
+            user = self.users.get(uid)
+            if user is None:
+                continue
+            if user.digest:
+                if uid not in digests:
+                    digests[uid] = Digest(uid)
+                digests[uid].nok.append((info, rules_triggered))
+                continue
             address_status = message_notification(info)
             if address_status is not None:
-                await bot.send_message(uid, address_status, parse_mode="html")
+                reasons = "\n".join(f"⚠️ {escape(reason)}" for reason in (describe(*rule) for rule in rules_triggered))
+                await send_to_user(uid, f"{reasons}\n\n{address_status}")
         self.timestamp = int(datetime.now().timestamp())
 
 type Watching = dict[str, Watched]
@@ -66,7 +132,9 @@ def read_csv(file_path) -> tuple[Watching, RevWatching]:
             uid = int(row["user"])
             notify_ok: bool = row.get("notify_ok", "False").lower() == "true"
             notify_nok: bool = row.get("notify_nok", "True").lower() == "true"
-            user = User(uid, notify_ok=notify_ok, notify_nok=notify_nok)
+            digest: bool = (row.get("digest") or "False").lower() == "true"
+            rules: Rules | None = parse_rules(row["rules"]) if row.get("rules") is not None else None
+            user = User(uid, notify_ok=notify_ok, notify_nok=notify_nok, digest=digest, rules=rules)
             if uid not in rev:
                 rev[uid] = []
             rev[uid].append(key)
@@ -78,15 +146,72 @@ def write_csv(file_path, data: Watching):
     """Write a list of dictionaries to a CSV file."""
     log(f"Writing {len(data)} entries to {file_path}")
     with file_path.open("w+", newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=["address", "user", "notify_ok", "notify_nok"])
+        writer = csv.DictWriter(f, fieldnames=["address", "user", "notify_ok", "notify_nok", "digest", "rules"])
         writer.writeheader()
         for address, watched in data.items():
             log(f"Writing address: {address} with users: {watched.users}")
             for uid, user in watched.users.items():
-                writer.writerow({"address": address, "user": str(uid), "notify_ok": str(user.notify_ok), "notify_nok": str(user.notify_nok)})
+                writer.writerow({"address": address, "user": str(uid), "notify_ok": str(user.notify_ok), "notify_nok": str(user.notify_nok), "digest": str(user.digest), "rules": format_rules(user.rules)})
 
 watching_file = data_dir / "watching.csv"
-watching, rev_watching = read_csv(watching_file)
+watching: Watching = {}
+rev_watching: RevWatching = {}
+watching_loaded = False
+subscriptions_loaded = asyncio.Event()
+load_wait = timedelta(seconds=30)  # How long a handler waits for the subscriptions to load
+bootstrapped = asyncio.Event()
+
+subscriptions_version = 0
+cached_rule_table: tuple[int, RuleTable] | None = None
+
+def subscriptions_changed():
+    """Invalidate the rule table after subscriptions or their rules changed."""
+    global subscriptions_version
+    subscriptions_version += 1
+
+def rule_table() -> RuleTable:
+    """Return the rule table of all subscriptions, rebuilt only when they changed."""
+    global cached_rule_table
+    if cached_rule_table is None or cached_rule_table[0] != subscriptions_version:
+        cached_rule_table = (subscriptions_version, RuleTable(watching))
+    return cached_rule_table[1]
+
+def save_watching():
+    """Write the subscriptions to disk, unless they were never loaded and would be erased."""
+    if not watching_loaded:
+        log("Subscriptions were not loaded, not overwriting the watching file.", level=loglevel.warn)
+        return
+    write_csv(watching_file, watching)
+
+async def load_watching():
+    """Load the subscriptions from disk, once per process."""
+    global watching_loaded
+    if watching_loaded:
+        return
+    loaded, rev = await asyncio.to_thread(read_csv, watching_file)
+    watching.update(loaded)
+    rev_watching.update(rev)
+    watching_loaded = True
+    subscriptions_changed()
+    subscriptions_loaded.set()
+
+async def subscriptions_ready(event) -> bool:
+    """Wait for the subscriptions to be loaded before a handler reads or changes them."""
+    if watching_loaded:
+        return True
+    try:
+        await asyncio.wait_for(subscriptions_loaded.wait(), load_wait.total_seconds())
+    except TimeoutError:
+        await event.reply("The bot is still starting. Please try again in a few minutes.")
+        return False
+    return True
+
+def new_user(uid: int) -> User:
+    """Create a subscription for a user, inheriting the settings of their other subscriptions."""
+    for address in rev_watching.get(uid, []):
+        user = watching[address].users[uid]
+        return User(uid, notify_ok=user.notify_ok, notify_nok=user.notify_nok, digest=user.digest)
+    return User(uid)
 
 address_pat = r"AU[1-9A-HJ-NP-Za-km-z]+"
 @command(address=address_pat)
@@ -98,20 +223,31 @@ async def watch(event, address: str):
     - address: Your Massa address.
       pattern: AU[1-9A-HJ-NP-Za-km-z]+
     """
+    if not await subscriptions_ready(event):
+        return
     uid = event.sender_id
-    info = await get_addresses_info(address)
-    if not api_started:
-        return await event.reply("API is still starting. Please try again in a few minutes.")
-    if not info:
-        return await event.reply(f"I could not find any information for this address. Please check if it is a valid staking address.\n\nIf you think this is an error, please contact @{TG_ADMIN}.")
+    if not is_valid_address(address):
+        return await event.reply("This is not a valid Massa address, please check it for typos.")
+    rolls = staker_index.get(address)
+    if rolls is None:
+        # The staker index is not built yet, ask the node directly
+        info = await get_addresses_info(address)
+        if not api_started:
+            return await event.reply("API is still starting. Please try again in a few minutes.")
+        if not info:
+            return await event.reply(f"I could not find any information for this address. Please check if it is a valid staking address.\n\nIf you think this is an error, please contact @{TG_ADMIN}.")
+        rolls = info[0].candidate_roll_count or 0
     if address not in watching:
         watching[address] = Watched(address)
     if uid not in rev_watching:
         rev_watching[uid] = []
     if uid in watching[address]:
         return await event.reply(f"You are already watching address: {address}")
-    watching[address].users[uid] = User(uid)
+    watching[address].users[uid] = new_user(uid)
     rev_watching[uid].append(address)
+    subscriptions_changed()
+    if not rolls:
+        return await event.reply(f"Started watching address: {address}\n\n⚠️ This address holds no rolls, it will not produce blocks until it buys some.")
     await event.reply(f"Started watching address: {address}")
 
 @command(address=address_pat)
@@ -123,6 +259,8 @@ async def unwatch(event, address):
     - address: Your Massa address.
       pattern: AU[1-9A-HJ-NP-Za-km-z]+
     """
+    if not await subscriptions_ready(event):
+        return
     uid = event.sender_id
     if address not in watching:
         return await event.reply("You are not watching any addresses.")
@@ -131,6 +269,7 @@ async def unwatch(event, address):
     if uid in rev_watching and address in rev_watching[uid]:
         rev_watching[uid].remove(address)
     watching[address].users.pop(uid, None)
+    subscriptions_changed()
     await event.reply(f"Stopped watching address: {address}")
 
 @command(index=r"\d+", event_btn=True)
@@ -139,6 +278,8 @@ async def status(event, index: int = 0):
     Show the status of your watched addresses.
     Usage: /status [index]
     """
+    if not await subscriptions_ready(event):
+        return
     uid = event.sender_id
     addresses = rev_watching.get(uid, [])
     if not addresses:
@@ -168,13 +309,233 @@ async def status(event, index: int = 0):
         buttons=buttons or None,
         parse_mode="html")
 
-async def get_addresses_info(*addresses: str):
+import_max_size = 5 * 1024 * 1024
+import_chunk_size = 1000
+import_retries = 2
+address_re = re.compile(address_pat)
+token_sep_re = re.compile(r"[\s,;]+")
+
+async def iter_document_lines(message):
+    """Stream the lines of a document attached to a message without loading it whole."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in bot.iter_download(message.media):
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def parse_address_file(message) -> tuple[list[str], list[str]]:
+    """Return the deduplicated valid addresses found in a document, and the invalid ones."""
+    valid: dict[str, None] = {}
+    invalid: dict[str, None] = {}
+    async for line in iter_document_lines(message):
+        for token in token_sep_re.split(line.strip().strip('"')):
+            token = token.strip('"\'')
+            if address_re.fullmatch(token) and is_valid_address(token):
+                valid[token] = None
+            elif token.startswith("AU"):
+                invalid[token] = None
+    return list(valid), list(invalid)
+
+async def find_existing_addresses(addresses: list[str]) -> set[str] | None:
+    """Check which addresses are known by the node, with batched `get_addresses` calls.
+
+    Addresses are checksum-validated beforehand, so a failed batch is most likely a node
+    hiccup: it is retried a few times before giving up.
+    Returns None if the node could not answer.
+    """
+    found: set[str] = set()
+    for chunk in batched(addresses, import_chunk_size):
+        for attempt in range(import_retries + 1):
+            info = await get_addresses_info(*chunk, prio=priority.background)
+            if info:
+                found.update(i.address for i in info)
+                break
+            if not api_started or attempt == import_retries:
+                return None
+            await asyncio.sleep(2 ** attempt)
+    return found
+
+@command(cmd="import")
+async def import_addresses(event):
+    """\
+    Import addresses to watch from a CSV or text file.
+    Usage: send a file with /import as caption, or reply /import to a file.
+    Every token that looks like an address is imported, one or more per line.
+    """
+    if not await subscriptions_ready(event):
+        return
+    uid = event.sender_id
+    message = event.message
+    if not message.document:
+        message = await event.get_reply_message()
+    if not message or not message.document:
+        return await event.reply("Please send a CSV or text file with /import as caption, or reply /import to one.")
+    if message.file.size > import_max_size:
+        return await event.reply(f"This file is too large, the limit is {import_max_size // (1024 * 1024)}MB.")
+    candidates, invalid = await parse_address_file(message)
+    already = [address for address in candidates if address in watching and uid in watching[address]]
+    new = [address for address in candidates if not (address in watching and uid in watching[address])]
+    found = await find_existing_addresses(new) if new else set()
+    if found is None:
+        if not api_started:
+            return await event.reply("API is still starting. Please try again in a few minutes.")
+        return await event.reply("The node did not answer, nothing was imported. Please try again later.")
+    not_found = [address for address in new if address not in found]
+    # Apply all changes at once, without awaiting in between
+    added = []
+    for address in new:
+        if address not in found:
+            continue
+        if address in watching and uid in watching[address]:
+            already.append(address)  # Watched while the node was queried
+            continue
+        if address not in watching:
+            watching[address] = Watched(address)
+        watching[address].users[uid] = new_user(uid)
+        rev_watching.setdefault(uid, []).append(address)
+        added.append(address)
+    if added:
+        subscriptions_changed()
+    log(f"User {uid} imported {len(added)} addresses ({len(already)} already watched, {len(invalid)} invalid, {len(not_found)} not found).")
+    msg = [
+        f"<b>Imported:</b> {len(added)} addresses",
+        f"<b>Already watching:</b> {len(already)}",
+    ]
+    for label, rejected in (("Invalid", invalid), ("Not found", not_found)):
+        if not rejected:
+            continue
+        msg.append(f"<b>{label}:</b> {len(rejected)}")
+        msg.extend(f"  - <code>{escape(address[:64])}</code>" for address in rejected[:10])
+        if len(rejected) > 10:
+            msg.append(f"  - ... and {len(rejected) - 10} more")
+    await event.reply("\n".join(msg), parse_mode="html")
+
+@command()
+async def export(event):
+    """\
+    Export your watched addresses as a CSV file.
+    Usage: /export
+    """
+    if not await subscriptions_ready(event):
+        return
+    uid = event.sender_id
+    addresses = rev_watching.get(uid, [])
+    if not addresses:
+        return await event.reply("You are not watching any addresses.\nUse /watch <address> to start watching a staking address.")
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(["address"])
+    writer.writerows([address] for address in addresses)
+    file = io.BytesIO(text.getvalue().encode("utf-8"))
+    file.name = "watching.csv"
+    await event.reply(f"You are watching {len(addresses)} addresses.", file=file)
+
+@command(mode=r"on|off|summary")
+async def digest(event, mode: str = ""):
+    """\
+    Group the alerts of all your addresses in one message per check.
+    Usage: /digest [on|off|summary]
+    - on: one digest message per check instead of one message per address
+    - summary: digest, plus a summary every few hours when everything is fine
+    - off: one message per address (default)
+    """
+    if not await subscriptions_ready(event):
+        return
+    uid = event.sender_id
+    addresses = rev_watching.get(uid, [])
+    if not addresses:
+        return await event.reply("You are not watching any addresses.\nUse /watch <address> to start watching a staking address.")
+    users = [watching[address].users[uid] for address in addresses]
+    if not mode:
+        current = "summary" if users[0].digest and users[0].notify_ok else "on" if users[0].digest else "off"
+        return await event.reply(f"Digest mode is {current}.\nUse /digest on|off|summary to change it.")
+    for user in users:
+        user.digest = mode != "off"
+        user.notify_ok = mode == "summary"
+    summary_sent.pop(uid, None)
+    await event.reply(f"Digest mode set to {mode} for {len(users)} addresses.")
+
+@command(mode=r"auto|off")
+async def node(event, mode: str = ""):
+    """\
+    Show the node's resource usage (admin only).
+    Usage: /node [auto|off]
+    - auto: restart the node when it leaks memory, away from watched block draws
+    - off: only alert (default)
+    """
+    if not await is_admin(event):
+        return await event.reply("This command is reserved to the bot admin.")
+    if mode:
+        node_monitor.restart_on_leak = mode == "auto"
+    await event.reply(f"<pre>{escape(node_monitor.report())}</pre>", parse_mode="html")
+
+@command(address=address_pat, alert="|".join(kinds), threshold=r"off|\d+(?:\.\d+)?", cycles=r"\d+")
+async def rule(event, address: str, alert: str = "", threshold: str = "", cycles: str = ""):
+    """\
+    Show or set the alert rules of a watched address.
+    Usage: /rule <address> [alert] [threshold|off] [cycles]
+    cycles: 1 to 10, for misses and miss_ratio only
+    alerts:
+    - misses: at least <threshold> missed blocks over the last <cycles> cycles (default: 1 over 2)
+    - miss_ratio: at least <threshold>% of blocks missed over the last <cycles> cycles
+    - roll_drop: candidate rolls at least <threshold> below final rolls
+    - balance_divergence: candidate balance differs from final balance by at least <threshold> MAS
+    """
+    if not await subscriptions_ready(event):
+        return
+    uid = event.sender_id
+    if address not in watching or uid not in watching[address]:
+        return await event.reply(f"You are not watching address: {address}")
+    user = watching[address].users[uid]
+    if alert and threshold == "off":
+        user.rules.pop(alert, None)
+        subscriptions_changed()
+    elif alert and threshold:
+        if alert in positive_thresholds and float(threshold) <= 0:
+            return await event.reply(f"The threshold of {alert} must be greater than 0, or it would alert on every check.")
+        if alert not in windowed_kinds:
+            if cycles:
+                return await event.reply(f"{alert} looks at the current balances only, it does not take a number of cycles.")
+            n = 1
+        elif cycles:
+            n = int(cycles)
+            if not 1 <= n <= max_cycles:
+                return await event.reply(f"The number of cycles must be between 1 and {max_cycles}.")
+        else:
+            n = user.rules.get(alert, (0, 2))[1]
+        user.rules[alert] = (float(threshold), n)
+        subscriptions_changed()
+    elif alert:
+        usage = f"/rule {address} {alert} &lt;threshold|off&gt;" + (" [cycles]" if alert in windowed_kinds else "")
+        return await event.reply(f"<b>{alert}:</b> {escape(kind_help[alert])}\n\nUsage: {usage}", parse_mode="html")
+    msg = [f"<b>Alert rules for</b> <code>{address}</code>:"]
+    msg.extend(f"  - {kind}: {escape(describe(kind, *settings))}" for kind, settings in user.rules.items())
+    if not user.rules:
+        msg.append("  No rule, you will not be alerted for this address.")
+    await event.reply("\n".join(msg), parse_mode="html")
+
+@command()
+async def perf(event):
+    """\
+    Show event loop stall statistics (admin only).
+    Usage: /perf
+    """
+    if not await is_admin(event):
+        return await event.reply("This command is reserved to the bot admin.")
+    await event.reply(f"<pre>{escape(loop_monitor.report())}\n\n{escape(rpc_scheduler.report())}\n\n{escape(startup_report())}</pre>", parse_mode="html")
+
+async def get_addresses_info(*addresses: str, prio: int = priority.interactive) -> list[AddressSnapshot] | None:
     global api_started
     if len(addresses) < 10:
         log("Fetching addresses info for:", addresses)
     else:
         log(f"Fetching info for {len(addresses)} addresses, this may take a while...")
-    result = await massa_api("get_addresses", list(addresses))
+    result = await massa_api("get_addresses", list(addresses), decode=decode_addresses, prio=prio)
     if not result:
         log(loglevel.error, "No addresses info returned from API.")
         return None
@@ -185,94 +546,205 @@ async def get_addresses_info(*addresses: str):
         api_started = True
     return result
 
-def should_notify_nok(info) -> bool:
-    """Check if the address has missed blocks."""
-    if not info:
-        return False
-    address = info["address"]
-    watched = watching[address]
-    if watched.timestamp > int(datetime.now().timestamp() - time_offset.total_seconds()):
-        # If the address was recently checked, do not notify
-        return False
-    for cycle in sorted(info.get("cycle_infos", []), key=lambda x: x["cycle"])[-2:]:  # Check the last two cycles
-        if cycle.get("nok_count", 0) > 0:
-            return True
-    return False
+def recent_cycles(info: AddressSnapshot, count: int = 2) -> tuple:
+    """Return the last `count` cycles of an address info, oldest first."""
+    return info.cycle_infos[-count:]
 
-def message_notification(info) -> (str | None):
+def message_notification(info: AddressSnapshot) -> (str | None):
     """Format a notification message for a user watching an address."""
-    address = info.get("address", None)
+    address = info.address
     if not address:
         return None
     message = [
         f"<b>Address:</b> <code>{address}</code>:",
-        f"<b>Balance:</b> <code>{info.get('final_balance', "0")}</code>MAS, candidate: <code>{info.get('candidate_balance', '0')}</code>MAS",
-        f"<b>Rolls:</b> final: <code>{info['final_roll_count'] or 'Unknown'}</code>, candidate: <code>{info.get('candidate_roll_count', '0')}</code>",
+        f"<b>Balance:</b> <code>{info.final_balance}</code>MAS, candidate: <code>{info.candidate_balance}</code>MAS",
+        f"<b>Rolls:</b> final: <code>{info.final_roll_count or 'Unknown'}</code>, candidate: <code>{info.candidate_roll_count or 0}</code>",
         "",
     ]
-    for cycle in info.get("cycle_infos", []):
-        id = cycle["cycle"]
-        is_final = cycle["is_final"]
-        ok_count = cycle["ok_count"]
-        nok_count = cycle["nok_count"]
-        active_rolls = cycle["active_rolls"]
+    for cycle in info.cycle_infos:
+        id = cycle.cycle
+        is_final = cycle.is_final
+        ok_count = cycle.ok_count
+        nok_count = cycle.nok_count
+        active_rolls = cycle.active_rolls
         message.append(f"<b>Cycle {id}:</b> ({'Final' if is_final else 'Not yet Final'})")
         message.append(f"  - <b>Active Rolls:</b> <code>{active_rolls}</code>")
         message.append(f"  - <b>✅ Blocks:</b> <code>{ok_count}</code>, <b>❌ Blocks:</b> <code>{nok_count}</code>")
         message.append("")
     return "\n  ".join(message)
 
+def short_address(address: str) -> str:
+    return f"{address[:6]}…{address[-4:]}"
+
+def digest_messages(digest: Digest) -> list[str]:
+    """Format a digest as a summary table, split in messages under Telegram's length limit."""
+    if digest.nok:
+        header = f"<b>⚠️ {len(digest.nok)} of your addresses triggered an alert</b>"
+    elif digest.skipped:
+        header = f"<b>✅ {len(digest.ok)} of your {len(digest.ok) + digest.skipped} addresses are fine</b>"
+    else:
+        header = f"<b>✅ All {len(digest.ok)} of your addresses are fine</b>"
+    if digest.skipped:
+        header += f"\n{digest.skipped} not checked this time: recently alerted or added, or the node did not answer."
+    rows = [f"{'Address':<11} {'Rolls':>6} {'✅':>5} {'❌':>4}"]
+    entries = itertools.chain(((i, "❌ " + ",".join(rule[0] for rule in triggered)) for i, triggered in digest.nok), ((i, "") for i in digest.ok))
+    for info, mark in entries:
+        cycles = recent_cycles(info)
+        ok_count = sum(c.ok_count for c in cycles)
+        nok_count = sum(c.nok_count for c in cycles)
+        rolls = info.candidate_roll_count or 0
+        rows.append(f"{short_address(info.address):<11} {rolls:>6} {ok_count:>5} {nok_count:>4} {mark}".rstrip())
+    footer = "Blocks over the last two cycles. Use /status for details."
+    messages = []
+    current = [header]
+    size = len(header) + len(footer) + len("\n<pre></pre>\n")
+    table: list[str] = []
+    for row in rows:
+        if table and size + len(row) + 1 > message_limit:
+            current.append("<pre>" + escape("\n".join(table)) + "</pre>")
+            messages.append("\n".join(current))
+            current, table = [], [rows[0]]
+            size = len(rows[0]) + len("<pre></pre>\n") + len(footer)
+        table.append(row)
+        size += len(row) + 1
+    current.append("<pre>" + escape("\n".join(table)) + "</pre>")
+    current.append(footer)
+    messages.append("\n".join(current))
+    return messages
+
+async def send_digests(digests: dict[int, Digest], summary_due: set[int]):
+    for uid, digest in digests.items():
+        if not digest.nok and uid not in summary_due:
+            continue
+        await send_to_user(uid, *digest_messages(digest))
+        if uid in summary_due:
+            summary_sent[uid] = datetime.now()  # Even on failure, not to retry a blocked user every sweep
+
 async def notify_missed_blocks():
-    cutoff = int(datetime.now().timestamp() - time_offset.total_seconds())
+    if not bootstrapped.is_set():
+        return
+    now = datetime.now()
+    cutoff = int(now.timestamp() - time_offset.total_seconds())
     filtered = {k: v for k, v in watching.items() if v.timestamp < cutoff}
-    for addresses in batched(filtered, 1000):
-        info = await get_addresses_info(*addresses)
+    summary_due = {
+        uid for uid, addresses in rev_watching.items() if addresses
+        if (user := watching[addresses[0]].users[uid]).digest and user.notify_ok
+        if now - summary_sent.get(uid, datetime.min) >= summary_interval
+    }
+    digests: dict[int, Digest] = {}
+    rules = rule_table()
+    addresses = list(filtered)
+    start = 0
+    while start < len(addresses):
+        # Use smaller batches while users are waiting on the node
+        size = rpc_scheduler.batch_size(priority.background, 1000)
+        chunk = addresses[start:start + size]
+        start += size
+        info = await get_addresses_info(*chunk, prio=priority.background)
         if not info:
             log(loglevel.warn, "No addresses info returned.")
             continue
+        triggered: dict[str, dict[int, list[Triggered]]] = {}
+        for address, uid, rule in rules.evaluate(info):
+            triggered.setdefault(address, {}).setdefault(uid, []).append(rule)
         for i in info:
-            if not should_notify_nok(i):
-                continue
-            address = i["address"]
-            await watching[address].notify_nok(i)
-        await asyncio.sleep(1)  # Rate limit to avoid overwhelming the node
+            address = i.address
+            if address not in watching:
+                continue  # Unwatched during the sweep
+            if address in triggered:
+                await watching[address].notify_nok(i, digests, triggered[address])
+            for uid in summary_due.intersection(watching[address].users).difference(triggered.get(address, ())):
+                if uid not in digests:
+                    digests[uid] = Digest(uid)
+                digests[uid].ok.append(i)
+        await asyncio.sleep(len(chunk) / 1000)  # Rate limit to avoid overwhelming the node
+    for uid, digest in digests.items():
+        if uid in summary_due:
+            checked = {i.address for i in digest.ok}.union(i.address for i, _ in digest.nok)
+            digest.skipped = len(set(rev_watching.get(uid, ())).difference(checked))
+    await send_digests(digests, summary_due)
+
+async def seconds_to_next_draw() -> float | None:
+    """Seconds until the next block draw of a watched address, None if it cannot be known."""
+    status = await massa_api("get_status", prio=priority.background)
+    if not status or "config" not in status:
+        return None
+    config = status["config"]
+    t0 = config["t0"]
+    next_slot = float("inf")
+    for addresses in batched(list(watching), 1000):
+        info = await get_addresses_info(*addresses, prio=priority.background)
+        if info is None:
+            return None
+        for i in info:
+            for period, thread in i.next_block_draws:
+                next_slot = min(next_slot, config["genesis_timestamp"] + period * t0 + thread * t0 / config["thread_count"])
+    return next_slot / 1000 - time.time()
 
 async def on_disconnect():
     global api_started
     api_started = False  # Reset API status on disconnect
 
+async def start_node(stack: AsyncExitStack):
+    await kill_node()  # A running node binary cannot be overwritten by the install
+    await phase("node install", install_massa_node())
+    process = await phase("node spawn", stack.enter_async_context(run_massa_node(
+        notify_missed_blocks, staker_index.refresh_if_stale, node_monitor.sample, on_disconnect=on_disconnect)))
+    node_monitor.attach(process, next_draw=seconds_to_next_draw)
+
+async def bootstrap(stack: AsyncExitStack):
+    """Run the independent startup phases concurrently."""
+    bootstrapped.clear()
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(phase("telegram login", bot.login()))
+        tg.create_task(phase("subscription load", load_watching()))
+        tg.create_task(start_node(stack))
+    bootstrapped.set()
+    log(startup_report())
+
+async def notify_admin(message: str):
+    """Send a message to the admin if Telegram is reachable, without ever raising."""
+    if bot.client is None or not bot.client.is_connected():
+        log("Telegram is not connected, could not notify the admin.", level=loglevel.warn)
+        return
+    await atry(bot.send_message, TG_ADMIN, message)
+
 async def main():
-    log("Connected to Telegram as", TG_USERNAME)
     try:
-        async with run_massa_node(notify_missed_blocks, on_disconnect=on_disconnect):
-            await bot.send_message(TG_ADMIN, f"Bot started successfully as {TG_USERNAME}.")
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(loop_monitor.monitor())
+            await phase("startup", bootstrap(stack))
+            log("Connected to Telegram as", TG_USERNAME)
+            await bot.send_message(TG_ADMIN, f"Bot started successfully as {TG_USERNAME}.\n\n{startup_report()}")
             await bot.run_until_disconnected()  # type: ignore
     except KeyboardInterrupt:
         log(loglevel.warn, "Bot stopped by user.")
-        await bot.send_message(TG_ADMIN, "Bot stopped by user.")
-        write_csv(watching_file, watching)
-    except Exception as e:
-        log(loglevel.error, f"Error in main: {e}\n{format_exc()}")
-        await bot.send_message(TG_ADMIN, f"Error in main: {e}\n{format_exc()}")
-        write_csv(watching_file, watching)
+        await notify_admin("Bot stopped by user.")
+        save_watching()
 
-if __name__ == "__main__":
-    build_default_commands()  # Register commands with the bot
-    with bot:
-        back_off = 10  # Initial backoff time in seconds
-        last_exception = datetime.now() - timedelta(minutes=5)
+async def run():
+    back_off = 10  # Initial backoff time in seconds
+    last_exception = datetime.now() - timedelta(minutes=5)
+    try:
         while True:
             try:
-                bot.loop.run_until_complete(main())
-            except KeyboardInterrupt:
-                write_csv(watching_file, watching)
-                log(loglevel.warn, "Bot stopped by user.")
-                break
+                await main()
             except Exception as e:
-                write_csv(watching_file, watching)
+                save_watching()
                 if datetime.now() - last_exception < timedelta(minutes=5):
                     back_off = min(back_off * 1.5, 60*10)  # Cap backoff at 10 minutes
+                last_exception = datetime.now()
                 log(loglevel.error, f"Error in main loop: {e}\n{format_exc()}")
-                bot.loop.run_until_complete(bot.send_message(TG_ADMIN, f"Error in main loop: {e}\n{format_exc()}"))
+                await notify_admin(f"Error in main loop: {e}\n{format_exc()}")
                 log("Restarting bot...")
-                time.sleep(back_off)
+                await asyncio.sleep(back_off)
+    finally:
+        await bot.logout()
+
+if __name__ == "__main__":
+    build_default_commands()  # Register commands with the bot
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        save_watching()
+        log(loglevel.warn, "Bot stopped by user.")
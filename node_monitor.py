@@ -0,0 +1,195 @@
+from keep_alive import BGProcess
+from keep_alive import atry
+from env import TG_ADMIN
+from env import loglevel
+from env import data_dir
+from env import bot
+from env import log
+
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections import deque
+from datetime import timedelta
+from datetime import datetime
+from pathlib import Path
+
+import asyncio
+import time
+import os
+
+mib = 1024 * 1024
+clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+class ProcSample:
+    __slots__ = ("timestamp", "cpu_ticks", "rss", "fds", "disk")
+
+    def __init__(self, timestamp: float, cpu_ticks: int, rss: int, fds: int, disk: int):
+        self.timestamp = timestamp
+        self.cpu_ticks = cpu_ticks
+        self.rss = rss
+        self.fds = fds
+        self.disk = disk
+
+def disk_usage(path: Path) -> int:
+    """Sum the size of the files under path, like `du -b`."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue  # The node removes files while we walk
+    return total
+
+def read_sample(pid: int, disk_path: Path) -> ProcSample | None:
+    """Read the resource usage of a process from /proc, to be run in a thread."""
+    proc = Path("/proc") / str(pid)
+    try:
+        stat = (proc / "stat").read_text()
+        fields = stat[stat.rindex(")") + 2:].split()  # The command name may contain spaces
+        cpu_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+        rss = 0
+        for line in (proc / "status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) * 1024
+                break
+        fds = len(os.listdir(proc / "fd"))
+    except (OSError, ValueError, IndexError):
+        return None
+    return ProcSample(time.monotonic(), cpu_ticks, rss, fds, disk_usage(disk_path))
+
+def slope_per_hour(samples: list[ProcSample], attr: str) -> float:
+    """Least squares growth rate of a sample attribute, per hour."""
+    if len(samples) < 2:
+        return 0.0
+    xs = [s.timestamp for s in samples]
+    ys = [getattr(s, attr) for s in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var * 3600
+
+class NodeMonitor:
+    """Sample the managed node process' CPU, memory, file descriptors and disk usage.
+
+    Samples are taken by `sample`, run as a keep alive background task. Crossing a
+    threshold sends an alert to the admin, and a memory leak can trigger a controlled
+    restart once no watched address is about to produce a block.
+    """
+    def __init__(self, disk_path: Path = data_dir / "massa", window: int = 60,
+                 rss_limit: int = 6 * 1024 * mib, fd_limit: int = 4096, cpu_limit: float = 90.0,
+                 disk_growth_limit: int = 1024 * mib, alert_cooldown: timedelta = timedelta(hours=1),
+                 restart_on_leak: bool = False, restart_margin: timedelta = timedelta(minutes=30),
+                 restart_cooldown: timedelta = timedelta(hours=6)):
+        self.disk_path = disk_path
+        self.samples: deque[ProcSample] = deque(maxlen=window)
+        self.rss_limit = rss_limit
+        self.fd_limit = fd_limit
+        self.cpu_limit = cpu_limit
+        self.disk_growth_limit = disk_growth_limit
+        self.alert_cooldown = alert_cooldown
+        self.restart_on_leak = restart_on_leak
+        self.restart_margin = restart_margin
+        self.restart_cooldown = restart_cooldown
+        self.process: BGProcess | None = None
+        self.next_draw: Callable[[], Awaitable[float | None]] | None = None
+        self.pid: int | None = None
+        self.alerted: dict[str, datetime] = {}
+        self.last_restart = datetime.min
+        self.restart_postponed = datetime.min
+
+    def attach(self, process: BGProcess, next_draw: Callable[[], Awaitable[float | None]] | None = None):
+        """Monitor a node process. `next_draw` returns the seconds until the next watched block draw."""
+        self.process = process
+        self.next_draw = next_draw
+
+    def cpu_percent(self) -> float:
+        if len(self.samples) < 2:
+            return 0.0
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last.timestamp - first.timestamp
+        if elapsed <= 0:
+            return 0.0
+        return (last.cpu_ticks - first.cpu_ticks) / clock_ticks / elapsed * 100
+
+    async def sample(self):
+        await atry(self._sample)
+
+    async def _sample(self):
+        if self.process is None or self.process.process is None:
+            return
+        pid = self.process.process.pid
+        sample = await asyncio.to_thread(read_sample, pid, self.disk_path)
+        if sample is None:
+            return
+        if pid != self.pid:
+            self.samples.clear()  # The node was restarted
+            self.pid = pid
+        self.samples.append(sample)
+        await self.check()
+
+    async def check(self):
+        last = self.samples[-1]
+        samples = list(self.samples)
+        rss_growth = slope_per_hour(samples, "rss")
+        disk_growth = slope_per_hour(samples, "disk")
+        cpu = self.cpu_percent()
+        alerts = {}
+        if last.rss > self.rss_limit:
+            alerts["rss"] = f"Node memory usage is {last.rss / mib:.0f}MiB (limit {self.rss_limit / mib:.0f}MiB), growing {rss_growth / mib:+.0f}MiB/h."
+        if last.fds > self.fd_limit:
+            alerts["fds"] = f"Node has {last.fds} open file descriptors (limit {self.fd_limit})."
+        if len(samples) == self.samples.maxlen and cpu > self.cpu_limit:
+            alerts["cpu"] = f"Node CPU usage averaged {cpu:.0f}% over the last {len(samples)} samples (limit {self.cpu_limit:.0f}%)."
+        if disk_growth > self.disk_growth_limit:
+            alerts["disk"] = f"Node data grows {disk_growth / mib:.0f}MiB/h, now {last.disk / mib:.0f}MiB."
+        now = datetime.now()
+        for key, message in alerts.items():
+            if now - self.alerted.get(key, datetime.min) < self.alert_cooldown:
+                continue
+            self.alerted[key] = now
+            log(message, level=loglevel.warn)
+            await bot.send_message(TG_ADMIN, f"⚠️ {message}")
+        if "rss" in alerts and rss_growth > 0 and self.restart_on_leak:
+            await self.schedule_restart()
+
+    async def schedule_restart(self):
+        """Restart the node if no watched address is expected to produce a block soon.
+
+        Looking up the next draw queries every watched address, so after a postponement
+        it is not looked up again before `alert_cooldown`.
+        """
+        now = datetime.now()
+        if self.process is None or now - self.last_restart < self.restart_cooldown:
+            return
+        if now - self.restart_postponed < self.alert_cooldown:
+            return
+        delay = await self.next_draw() if self.next_draw else float("inf")
+        if delay is None or delay < self.restart_margin.total_seconds():
+            self.restart_postponed = now
+            log(f"Node restart postponed, next watched block draw in {delay}s.")
+            return
+        self.last_restart = datetime.now()
+        self.process.request_restart()
+        log("Scheduled a controlled node restart.", level=loglevel.warn)
+        await bot.send_message(TG_ADMIN, "🔄 Restarting the node to reclaim leaked memory, no watched block draw is expected soon.")
+
+    def report(self) -> str:
+        if not self.samples:
+            return "No node sample yet."
+        samples = list(self.samples)
+        last = samples[-1]
+        rss = [s.rss / mib for s in samples]
+        fds = [s.fds for s in samples]
+        return "\n".join([
+            f"Node PID {self.pid}, {len(samples)} samples",
+            f"CPU: {self.cpu_percent():.1f}%",
+            f"RSS: {last.rss / mib:.0f}MiB (min {min(rss):.0f}, mean {sum(rss) / len(rss):.0f}, max {max(rss):.0f}), {slope_per_hour(samples, 'rss') / mib:+.1f}MiB/h",
+            f"FDs: {last.fds} (min {min(fds)}, max {max(fds)})",
+            f"Disk: {last.disk / mib:.0f}MiB, {slope_per_hour(samples, 'disk') / mib:+.1f}MiB/h",
+            f"Restart on leak: {'on' if self.restart_on_leak else 'off'}",
+        ])
+
+node_monitor = NodeMonitor()
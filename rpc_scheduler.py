@@ -0,0 +1,99 @@
+from contextlib import asynccontextmanager
+
+import itertools
+import asyncio
+import time
+
+class Priority:
+    interactive = 0
+    alerting = 1
+    background = 2
+    names = ("interactive", "alerting", "background")
+
+priority = Priority()
+
+class RPCScheduler:
+    """Share the node's API between interactive handlers, alerting checks and background sweeps.
+
+    Each priority class has its own concurrency limit on top of a global one. Waiting
+    requests are served by priority then arrival order, so an interactive request jumps
+    ahead of queued background batches, and background callers are asked to use smaller
+    batches while interactive requests are around.
+    """
+    def __init__(self, max_concurrency: int = 4, limits: tuple[int, int, int] = (4, 2, 1),
+                 timeouts: tuple[float, float, float] = (5, 10, 30), interactive_grace: float = 5.0):
+        self.max_concurrency = max_concurrency
+        self.limits = limits
+        self.timeouts = timeouts
+        self.interactive_grace = interactive_grace
+        self.active = [0, 0, 0]
+        self.waiting: list[tuple[int, int, asyncio.Future]] = []
+        self.seq = itertools.count()
+        self.last_interactive = float("-inf")
+        self.served = [0, 0, 0]
+        self.waited = [0.0, 0.0, 0.0]
+
+    def can_run(self, prio: int) -> bool:
+        return self.active[prio] < self.limits[prio] and sum(self.active) < self.max_concurrency
+
+    def timeout(self, prio: int) -> float:
+        return self.timeouts[prio]
+
+    def interactive_load(self) -> bool:
+        if self.active[priority.interactive] or any(p == priority.interactive for p, _, _ in self.waiting):
+            return True
+        return time.monotonic() - self.last_interactive < self.interactive_grace
+
+    def batch_size(self, prio: int, size: int, min_size: int = 50) -> int:
+        """Return the batch size a caller should use, smaller for background work under interactive load."""
+        if prio == priority.background and self.interactive_load():
+            return max(min(size, min_size), size // 10)
+        return size
+
+    def wake(self):
+        for entry in sorted(self.waiting):
+            prio, _, fut = entry
+            if fut.done():
+                self.waiting.remove(entry)
+            elif self.can_run(prio):
+                self.waiting.remove(entry)
+                self.active[prio] += 1
+                fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, prio: int):
+        start = time.monotonic()
+        if prio == priority.interactive:
+            self.last_interactive = start
+        if self.can_run(prio) and not any(p <= prio for p, _, _ in self.waiting):
+            self.active[prio] += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            entry = (prio, next(self.seq), fut)
+            self.waiting.append(entry)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self.active[prio] -= 1  # The slot was granted as we got cancelled
+                    self.wake()
+                elif entry in self.waiting:
+                    self.waiting.remove(entry)
+                raise
+        self.served[prio] += 1
+        self.waited[prio] += time.monotonic() - start
+        try:
+            yield
+        finally:
+            self.active[prio] -= 1
+            self.wake()
+
+    def report(self) -> str:
+        lines = ["RPC scheduler:"]
+        for prio, name in enumerate(priority.names):
+            mean_wait = self.waited[prio] / self.served[prio] if self.served[prio] else 0.0
+            lines.append(f"{name}: active={self.active[prio]}/{self.limits[prio]} served={self.served[prio]} mean wait={mean_wait:.3f}s")
+        lines.append(f"queued: {len(self.waiting)}")
+        return "\n".join(lines)
+
+rpc_scheduler = RPCScheduler()
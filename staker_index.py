@@ -0,0 +1,91 @@
+from massa_node_manager import massa_api
+from keep_alive import atry
+from rpc_scheduler import priority
+from env import loglevel
+from env import log
+
+from datetime import timedelta
+from datetime import datetime
+
+import hashlib
+
+b58_alphabet = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+b58_index = {c: i for i, c in enumerate(b58_alphabet)}
+address_prefix = "AU"
+address_hash_size = 32
+
+def b58decode(data: str) -> bytes:
+    """Decode a base58 string, raising ValueError on characters outside the alphabet."""
+    n = 0
+    for c in data:
+        if c not in b58_index:
+            raise ValueError(f"Invalid base58 character: {c!r}")
+        n = n * 58 + b58_index[c]
+    leading_zeros = len(data) - len(data.lstrip("1"))
+    return b"\0" * leading_zeros + n.to_bytes((n.bit_length() + 7) // 8, "big")
+
+def is_valid_address(address: str) -> bool:
+    """Check the base58check encoding of a user address: `AU` + base58check(version + hash)."""
+    if not address.startswith(address_prefix):
+        return False
+    try:
+        raw = b58decode(address[len(address_prefix):])
+    except ValueError:
+        return False
+    payload, checksum = raw[:-4], raw[-4:]
+    if len(payload) != 1 + address_hash_size or payload[0] != 0:
+        return False
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] == checksum
+
+def valid_staker(entry) -> bool:
+    """Check a `get_stakers` entry is an [address, rolls] pair."""
+    return (isinstance(entry, (list, tuple)) and len(entry) == 2
+            and isinstance(entry[0], str) and isinstance(entry[1], int))
+
+class StakerIndex:
+    """In-memory index of the network's stakers and their roll counts, refreshed periodically."""
+    def __init__(self, refresh_interval: timedelta = timedelta(minutes=10), page_size: int = 1000):
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.rolls: dict[str, int] = {}
+        self.refreshed_at: datetime | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at is not None
+
+    def get(self, address: str) -> int | None:
+        """Return the roll count of an address, 0 if it is not staking, or None if the index is not built yet."""
+        if not self.ready:
+            return None
+        return self.rolls.get(address, 0)
+
+    async def refresh(self) -> bool:
+        rolls: dict[str, int] = {}
+        offset = 0
+        while True:
+            page = await massa_api("get_stakers", {"offset": offset, "limit": self.page_size}, prio=priority.background)
+            if page is None:
+                log(f"Could not refresh the staker index at offset {offset}, keeping the previous one.", level=loglevel.warn)
+                return False
+            if not isinstance(page, list) or not all(valid_staker(entry) for entry in page):
+                log(f"Unexpected get_stakers page at offset {offset}, keeping the previous staker index.", level=loglevel.warn)
+                return False
+            for address, count in page:
+                rolls[address] = count
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size
+        self.rolls = rolls
+        self.refreshed_at = datetime.now()
+        log(f"Staker index refreshed: {len(rolls)} stakers, {sum(rolls.values())} rolls.")
+        return True
+
+    async def refresh_if_stale(self):
+        await atry(self._refresh_if_stale)
+
+    async def _refresh_if_stale(self):
+        if self.refreshed_at is None or datetime.now() - self.refreshed_at >= self.refresh_interval:
+            await self.refresh()
+
+staker_index = StakerIndex()